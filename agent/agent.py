@@ -1,19 +1,35 @@
-from typing import List, Dict, Any, Optional, Tuple
-from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, Sequence, Deque, Union
+from collections import OrderedDict, deque
+from pydantic import BaseModel, Field, field_validator
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.tools import Tool
-from tools.agent_tools import FileTools, FileInfo
+from pydantic_ai.models.openai import OpenAIChatModel
+from pydantic_ai.providers.openai import OpenAIProvider
+from tools.agent_tools import FileTools, FileInfo, get_file_tools
 from dotenv import load_dotenv
 from enum import Enum
+from pathlib import Path
+import httpx2
+import numpy as np
+import orjson
+import asyncio
+import logging
+import math
+import functools
 import os
+import re
+import time
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+PROMPT_DIR = Path(__file__).parent
+
+@functools.lru_cache(maxsize=None)
 def load_prompt(filename: str) -> str:
     """Loads a prompt from a file in the same directory as this script."""
-    prompt_path = os.path.join(os.path.dirname(__file__), filename)
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    return (PROMPT_DIR / filename).read_text(encoding='utf-8')
 
 class RequestType(Enum):
     INVALID = "invalid"
@@ -25,95 +41,358 @@ class RequestClassification(BaseModel):
     confidence: float = Field(ge=0.0, le=1.0)
     reasoning: str
 
+# Requests simple enough to route without asking the classifier model. Single-file
+# operations need a target that looks like a filename (name.ext), so bulk or
+# conditional ones such as "delete logs" or "remove duplicates" still reach it.
+_FILENAME = r"[\w-]+(?:\.[\w-]+)*\.\w+"
+_FAST_PATTERNS = re.compile(
+    r"^(?:list|show|ls)(?: all)?(?: (?:the )?files?)?$"
+    rf"|^(?:delete|remove|rm) {_FILENAME}$"
+    rf"|^(?:read|cat|open) {_FILENAME}$",
+    re.I,
+)
+_UNRELATED = re.compile(r"\b(?:weather|joke|president)\b", re.I)
+_FILE_TERMS = re.compile(r"\b(?:files?|folders?|director(?:y|ies)|read|write|create|delete|list)\b|\.\w+\b", re.I)
+
+def fast_classify(user_input: str) -> Optional[RequestClassification]:
+    """Classifies trivial requests with regexes, returning None when the model is needed."""
+    text = user_input.strip()
+    if _FAST_PATTERNS.match(text):
+        return RequestClassification(request_type=RequestType.SIMPLE, confidence=1.0, reasoning="rule-matched")
+    if _UNRELATED.search(text) and not _FILE_TERMS.search(text):
+        return RequestClassification(
+            request_type=RequestType.INVALID,
+            confidence=1.0,
+            reasoning="rule-matched: request is unrelated to file management",
+        )
+    return None
+
+class ClassifierCache:
+    """Caches classifications by normalized input, with an optional embedding-similarity tier."""
+
+    _PUNCTUATION = re.compile(r"[^\w\s]")
+    _WHITESPACE = re.compile(r"\s+")
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl_seconds: Optional[float] = 3600.0,
+        embed: Optional[Callable[[str], Awaitable[Sequence[float]]]] = None,
+        similarity_threshold: float = 0.92,
+        max_semantic_entries: int = 256,
+    ):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self._exact: "OrderedDict[str, Tuple[float, RequestClassification]]" = OrderedDict()
+        self._semantic: List[Tuple[np.ndarray, RequestClassification, float]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._last_embedding: Optional[Tuple[str, np.ndarray]] = None
+
+    @classmethod
+    def normalize(cls, user_input: str) -> str:
+        text = cls._PUNCTUATION.sub("", user_input.lower())
+        return cls._WHITESPACE.sub(" ", text).strip()
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds
+
+    async def _embedding(self, key: str) -> np.ndarray:
+        if self._last_embedding is not None and self._last_embedding[0] == key:
+            return self._last_embedding[1]
+        vector = np.asarray(await self.embed(key), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        self._last_embedding = (key, vector)
+        return vector
+
+    def _drop_expired_semantic(self) -> None:
+        if self.ttl_seconds is None:
+            return
+        kept = [entry for entry in self._semantic if not self._expired(entry[2])]
+        if len(kept) != len(self._semantic):
+            self._semantic = kept
+            self._matrix = None
+
+    async def lookup(self, user_input: str) -> Optional[RequestClassification]:
+        """Returns a cached classification for the input, or None on a miss."""
+        key = self.normalize(user_input)
+        entry = self._exact.get(key)
+        if entry is not None:
+            if not self._expired(entry[0]):
+                self._exact.move_to_end(key)
+                return entry[1]
+            del self._exact[key]
+
+        if self.embed is None:
+            return None
+        self._drop_expired_semantic()
+        if not self._semantic:
+            return None
+        if self._matrix is None:
+            self._matrix = np.vstack([vector for vector, _, _ in self._semantic])
+        try:
+            similarities = np.dot(self._matrix, await self._embedding(key))
+        except Exception as e:
+            log.warning("Semantic cache lookup failed, treating as a miss: %s", e)
+            return None
+        best = int(np.argmax(similarities))
+        if similarities[best] > self.similarity_threshold:
+            return self._semantic[best][1]
+        return None
+
+    async def store(self, user_input: str, classification: RequestClassification) -> None:
+        key = self.normalize(user_input)
+        now = time.monotonic()
+        self._exact[key] = (now, classification)
+        self._exact.move_to_end(key)
+        if len(self._exact) > self.maxsize:
+            self._exact.popitem(last=False)
+
+        if self.embed is None:
+            return
+        try:
+            vector = await self._embedding(key)
+        except Exception as e:
+            log.warning("Semantic cache store failed, skipping: %s", e)
+            return
+        self._semantic.append((vector, classification, now))
+        if len(self._semantic) > self.max_semantic_entries:
+            self._semantic.pop(0)
+        self._matrix = None
+
+
+class QueryBatcher:
+    """Coalesces concurrent calls into a single call of a batched function."""
+
+    def __init__(self, batch_fn: Callable[[List[str]], List[str]], max_batch_size: int = 16, max_latency_ms: float = 0.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def acall(self, item: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            # A zero delay still waits one loop iteration, which collects every
+            # call issued concurrently (parallel tool calls, other sessions).
+            self._timer = loop.call_later(self.max_latency_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        
+        # batch_fn does blocking file I/O, so run it in a worker thread and resolve
+        # the callers' futures back on the loop once it finishes.
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(None, self.batch_fn, [item for item, _ in batch])
+        work.add_done_callback(lambda done: self._resolve(batch, done))
+
+    @staticmethod
+    def _resolve(batch: List[Tuple[str, asyncio.Future]], done: asyncio.Future) -> None:
+        error = done.exception()
+        if error is not None:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        
+        for (_, future), result in zip(batch, done.result()):
+            if not future.done():
+                future.set_result(result)
+
+
+HISTORY_SIZE = 10
+
 class AgentState(BaseModel):
     base_dir: str
     last_action: Optional[str] = None
     last_result: Optional[str] = None
+    conversation_history: Deque[Dict[str, str]] = Field(default_factory=lambda: deque(maxlen=HISTORY_SIZE))
+
+    @field_validator("conversation_history")
+    @classmethod
+    def _bound_history(cls, history: Deque[Dict[str, str]]) -> Deque[Dict[str, str]]:
+        # Validation builds a plain deque from whatever was passed in; re-apply the bound.
+        if history.maxlen == HISTORY_SIZE:
+            return history
+        return deque(history, maxlen=HISTORY_SIZE)
+
+def build_model(
+    model: Optional[str], get_provider: Callable[[], OpenAIProvider]
+) -> Union[str, OpenAIChatModel, None]:
+    """Builds OpenAI models on the shared provider; anything else (including None) is passed through.
+
+    The provider is only requested for OpenAI models, so other providers don't need an OpenAI key.
+    """
+    if not isinstance(model, str):
+        return model
+    provider_name, _, model_name = model.partition(":")
+    if provider_name == "openai":
+        return OpenAIChatModel(model_name, provider=get_provider())
+    return model
 
 class MultiModelFileAgent:
-    def __init__(self, base_dir: str, light_model: str, powerful_model: str):
+    def __init__(
+        self,
+        base_dir: str,
+        light_model: str,
+        powerful_model: str,
+        embedding_model: Optional[str] = None,
+        cache_ttl_seconds: Optional[float] = 3600.0,
+        speculative_complex: bool = False,
+        tools: Optional[FileTools] = None,
+    ):
         self.light_model = light_model
         self.powerful_model = powerful_model
-        self.tools = FileTools(base_dir)
+        # Created by openai_provider on first use.
+        self.http_client: Optional[httpx2.AsyncClient] = None
+        self._openai_provider: Optional[OpenAIProvider] = None
+        # Starts the main agent alongside the classifier and cancels it unless the
+        # request is complex. Cancelled runs still spend tokens and may already have
+        # executed tool calls, so this is off by default.
+        self.speculative_complex = speculative_complex
+        # Agents working on the same directory share one FileTools and its caches.
+        self.tools = tools if tools is not None else get_file_tools(base_dir)
         self.state = AgentState(base_dir=base_dir)
+        self._answer_batcher = QueryBatcher(self.tools.answer_questions_about_files)
+        self.classifier_cache = ClassifierCache(
+            ttl_seconds=cache_ttl_seconds,
+            embed=self._build_embedder(embedding_model) if embedding_model else None,
+        )
+        
+        # Built once and shared by both agents instead of registering a fresh set
+        # of closures on each of them.
+        self.agent_tools = self.build_tools()
         
         self.classifier = Agent(
-            model=light_model,
+            model=build_model(light_model, self._get_openai_provider),
             deps_type=AgentState,
             output_type=RequestClassification,
             system_prompt=load_prompt("classifier_prompt.txt")
         )
         
         self.main_agent = Agent(
-            model=powerful_model,
+            model=build_model(powerful_model, self._get_openai_provider),
             deps_type=AgentState,
             output_type=str,
-            system_prompt=load_prompt("main_agent_prompt.txt")
+            system_prompt=load_prompt("main_agent_prompt.txt"),
+            tools=self.agent_tools
         )
         
         self.simple_agent = Agent(
-            model=light_model,
+            model=build_model(light_model, self._get_openai_provider),
             deps_type=AgentState,
             output_type=str,
-            system_prompt=load_prompt("simple_agent_prompt.txt")
+            system_prompt=load_prompt("simple_agent_prompt.txt"),
+            tools=self.agent_tools
         )
-        
-        self.register_tools(self.main_agent)
-        self.register_tools(self.simple_agent)
     
-    def register_tools(self, agent):
-        @agent.tool_plain
-        def list_files() -> List[Dict[str, Any]]:
-            files = self.tools.list_files()
-            print(f"Listing files:")
-            print(files)
+    @property
+    def openai_provider(self) -> OpenAIProvider:
+        return self._get_openai_provider()
+    
+    def _get_openai_provider(self) -> OpenAIProvider:
+        if self._openai_provider is None:
+            # One connection pool for every agent, so requests reuse warm keep-alive
+            # connections instead of each agent paying its own TLS handshakes.
+            self.http_client = httpx2.AsyncClient(
+                http2=True,
+                limits=httpx2.Limits(max_connections=100, max_keepalive_connections=50),
+                timeout=httpx2.Timeout(600, connect=5),
+            )
+            self._openai_provider = OpenAIProvider(http_client=self.http_client)
+        return self._openai_provider
+    
+    def _build_embedder(self, embedding_model: str) -> Callable[[str], Awaitable[Sequence[float]]]:
+        client = self.openai_provider.client
+
+        async def embed(text: str) -> Sequence[float]:
+            response = await client.embeddings.create(model=embedding_model, input=text)
+            return response.data[0].embedding
+
+        return embed
+    
+    def build_tools(self) -> List[Tool]:
+        def list_files(ctx: RunContext[AgentState]) -> List[Dict[str, Any]]:
+            files = self.tools.list_files_raw()
+            log.debug("Listing files: %d found", len(files))
             
-            self.state.last_action = "list_files"
-            self.state.last_result = f"Found {len(files)} files"
-            return [f.model_dump() for f in files]
+            ctx.deps.last_action = "list_files"
+            ctx.deps.last_result = f"Found {len(files)} files"
+            return files
             
-        @agent.tool_plain
-        def read_file(filename: str) -> str:
+        def read_file(ctx: RunContext[AgentState], filename: str) -> str:
             """Read and return the content of a file."""
             content = self.tools.read_file(filename)
-            print(f"Reading file: {filename}")
+            log.debug("Reading file: %s", filename)
             
-            self.state.last_action = f"read_file: {filename}"
-            self.state.last_result = f"Read {len(content)} characters"
+            ctx.deps.last_action = f"read_file: {filename}"
+            ctx.deps.last_result = f"Read {len(content)} characters"
             return content
         
-        @agent.tool_plain
-        def write_file(filename: str, content: str, mode: str = 'w') -> str:
+        def write_file(ctx: RunContext[AgentState], filename: str, content: str, mode: str = 'w') -> str:
             """Write content to a file. Mode can be 'w' (overwrite) or 'a' (append)."""
             result = self.tools.write_file(filename, content, mode)
-            print(f"Writing file: {filename}")
+            log.debug("Writing file: %s", filename)
             
-            self.state.last_action = f"write_file: {filename} (mode: {mode})"
-            self.state.last_result = f"Wrote {len(content)} characters"
+            ctx.deps.last_action = f"write_file: {filename} (mode: {mode})"
+            ctx.deps.last_result = f"Wrote {len(content)} characters"
             return result
         
-        @agent.tool_plain
-        def delete_file(filename: str) -> str:
+        def delete_file(ctx: RunContext[AgentState], filename: str) -> str:
             result = self.tools.delete_file(filename)
-            print(f"Deleting file: {filename}")
-            self.state.last_action = f"delete_file: {filename}"
-            self.state.last_result = "File deleted successfully"
+            log.debug("Deleting file: %s", filename)
+            ctx.deps.last_action = f"delete_file: {filename}"
+            ctx.deps.last_result = "File deleted successfully"
             return result
         
-        @agent.tool_plain
-        def answer_question_about_files(query: str) -> str:
-            result = self.tools.answer_question_about_files(query)
-            print(f"Answering question about files: {query}")
-            self.state.last_action = f"answer_question: {query[:50]}..."
-            self.state.last_result = "Analyzed files and provided answer"
+        async def answer_question_about_files(ctx: RunContext[AgentState], query: str) -> str:
+            result = await self._answer_batcher.acall(query)
+            log.debug("Answering question about files: %s", query)
+            ctx.deps.last_action = f"answer_question: {query[:50]}..."
+            ctx.deps.last_result = "Analyzed files and provided answer"
             return result
         
+        return [
+            Tool(list_files),
+            Tool(read_file),
+            Tool(write_file),
+            Tool(delete_file),
+            Tool(answer_question_about_files),
+        ]
+    
+    async def aclose(self) -> None:
+        if self.http_client is not None:
+            await self.http_client.aclose()
     
-    async def classify_request(self, user_input: str) -> RequestClassification:
+    async def classify_request(self, user_input: str, state: Optional[AgentState] = None) -> RequestClassification:
         try:
-            result = await self.classifier.run(user_input, deps=self.state)
+            matched = fast_classify(user_input)
+            if matched is not None:
+                log.info("Classification (rule): %s", matched.request_type.value)
+                return matched
+            
+            cached = await self.classifier_cache.lookup(user_input)
+            if cached is not None:
+                log.info("Classification (cached): %s (confidence: %s)", cached.request_type.value, cached.confidence)
+                return cached
+            
+            result = await self.classifier.run(user_input, deps=state if state is not None else self.state)
             classification = result.output
-            print(f"Classification: {classification.request_type.value} (confidence: {classification.confidence})")
+            await self.classifier_cache.store(user_input, classification)
+            log.info("Classification: %s (confidence: %s)", classification.request_type.value, classification.confidence)
             return classification
         except Exception as e:
             return RequestClassification(
@@ -129,39 +408,121 @@ class MultiModelFileAgent:
         else:
             return f"I couldn't understand your request. {classification.reasoning} Please rephrase your question more clearly, focusing on what you'd like to do with files."
     
-    async def handle_simple_request(self, user_input: str) -> str:
+    def get_context_for_prompt(self, state: Optional[AgentState] = None) -> str:
+        """Renders the session state as a short prefix for the user message.
+
+        The system prompts stay byte-identical across turns so providers can reuse
+        their cached prefix; only this small block changes.
+        """
+        state = state if state is not None else self.state
+        lines = []
+        if state.last_action is not None:
+            lines.append(f"last_action={state.last_action}; last_result={state.last_result}")
+        if state.conversation_history:
+            recent = [
+                {"user_input": h["user_input"], "response": h["response"][:80]}
+                for h in list(state.conversation_history)[-3:]
+            ]
+            lines.append("recent_turns=" + orjson.dumps(recent).decode())
+        if not lines:
+            return ""
+        return "<context>" + "\n".join(lines) + "</context>\n"
+    
+    async def handle_simple_request(self, user_input: str, state: Optional[AgentState] = None) -> str:
+        state = state if state is not None else self.state
         try: 
-            result = await self.simple_agent.run(user_input, deps=self.state)
+            result = await self.simple_agent.run(self.get_context_for_prompt(state) + user_input, deps=state)
             return result.output
         except Exception as e:
             return f"Error handling simple request: {str(e)}"
     
-    async def handle_complex_request(self, user_input: str) -> str:
+    async def handle_complex_request(self, user_input: str, state: Optional[AgentState] = None) -> str:
+        state = state if state is not None else self.state
         try:
-            result = await self.main_agent.run(user_input, deps=self.state)
+            result = await self.main_agent.run(self.get_context_for_prompt(state) + user_input, deps=state)
             return result.output
         except Exception as e:
             return f"Error handling complex request: {str(e)}"
     
-    async def process(self, user_input: str) -> str:
+    async def process(self, user_input: str, state: Optional[AgentState] = None) -> str:
+        state = state if state is not None else self.state
+        speculative_task = None
         try:
-            classification = await self.classify_request(user_input)
+            if self.speculative_complex:
+                speculative_task = asyncio.create_task(self.handle_complex_request(user_input, state))
+            
+            classification = await self.classify_request(user_input, state)
+            
+            if speculative_task is not None and classification.request_type != RequestType.COMPLEX:
+                speculative_task.cancel()
+                speculative_task = None
             
             # Use the enum value properly
             if classification.request_type == RequestType.INVALID:
                 response = await self.handle_invalid_request(classification)
                 
             elif classification.request_type == RequestType.SIMPLE:
-                print("Using simple agent...")
-                response = await self.handle_simple_request(user_input)
+                log.info("Using simple agent...")
+                response = await self.handle_simple_request(user_input, state)
                     
             else:  # RequestType.COMPLEX
-                print("Using complex agent...")
-                response = await self.handle_complex_request(user_input)
+                log.info("Using complex agent...")
+                if speculative_task is not None:
+                    response = await speculative_task
+                else:
+                    response = await self.handle_complex_request(user_input, state)
     
+            state.conversation_history.append({"user_input": user_input, "response": response})
             return response
             
         except Exception as e:
             error_msg = f"Error processing request: {str(e)}"
-            self.state.last_result = error_msg
+            state.last_result = error_msg
             return error_msg
+        
+        finally:
+            if speculative_task is not None and not speculative_task.done():
+                speculative_task.cancel()
+    
+    async def process_many(
+        self,
+        inputs: List[str],
+        max_concurrency: int = 16,
+        hedge_delay: Optional[float] = None,
+        hedge_budget: float = 0.05,
+    ) -> List[str]:
+        """Processes several requests concurrently, returning responses in input order.
+
+        With hedge_delay set, a request still running after that many seconds is
+        duplicated and the first response wins, for at most hedge_budget of the
+        inputs (rounded up, so any positive budget allows at least one hedge).
+        Duplicates re-run any tool calls, so only hedge idempotent requests.
+
+        Each request runs on its own copy of the session state, so concurrent runs
+        don't see each other's actions and are left out of the shared history.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        hedges_left = math.ceil(len(inputs) * hedge_budget)
+        
+        async def hedged(user_input: str, state: AgentState) -> str:
+            nonlocal hedges_left
+            primary = asyncio.create_task(self.process(user_input, state))
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            if done or hedges_left <= 0:
+                return await primary
+            
+            hedges_left -= 1
+            backup = asyncio.create_task(self.process(user_input, state))
+            done, pending = await asyncio.wait({primary, backup}, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            return done.pop().result()
+        
+        async def guarded(user_input: str) -> str:
+            state = self.state.model_copy(deep=True)
+            async with semaphore:
+                if hedge_delay is None:
+                    return await self.process(user_input, state)
+                return await hedged(user_input, state)
+        
+        return list(await asyncio.gather(*[guarded(user_input) for user_input in inputs]))
@@ -4,11 +4,14 @@ from pydantic_ai import Agent, RunContext
 from pydantic_ai.tools import Tool
 from dotenv import load_dotenv
 from enum import Enum
+from pathlib import Path
+import functools
 import os
 import argparse
 import asyncio
 import sys
 import json
+import logging
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
@@ -17,10 +20,11 @@ from tools.agent_tools import FileTools, FileInfo
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=None)
 def load_prompt(filename: str) -> str:
-    prompt_path = os.path.join(project_root, "agent", filename)
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    return (Path(project_root) / "agent" / filename).read_text(encoding='utf-8')
 
 class RequestType(Enum):
     INVALID = "invalid"
@@ -28,16 +32,15 @@ class RequestType(Enum):
     COMPLEX = "complex"
 
 class RequestClassification(BaseModel):
-    request_type: str
+    request_type: RequestType
     confidence: float = Field(ge=0.0, le=1.0)
     reasoning: str
 
 class MultiModelFileAgent:
-    def __init__( self, base_dir: str, light_model: str, powerful_model: str, verbose: bool = False):
+    def __init__( self, base_dir: str, light_model: str, powerful_model: str):
         self.light_model = light_model
         self.powerful_model = powerful_model
         self.tools = FileTools(base_dir)
-        self.verbose = verbose
 
         self.classifier = Agent(
             model=light_model,
@@ -60,39 +63,33 @@ class MultiModelFileAgent:
             system_prompt=load_prompt("simple_agent_prompt.txt")
         )
         
-        self.register_tools(self.main_agent, verbose=self.verbose)
-        self.register_tools(self.simple_agent, verbose=self.verbose)
+        self.register_tools(self.main_agent)
+        self.register_tools(self.simple_agent)
     
-    def register_tools(self, agent, verbose: bool = False):
+    def register_tools(self, agent):
         @agent.tool_plain
         def list_files() -> List[Dict[str, Any]]:
-            files = self.tools.list_files()
-            if verbose:
-                print("Listing files")
-            return [f.model_dump() for f in files]
+            log.debug("Listing files")
+            return self.tools.list_files_raw()
         
         @agent.tool_plain
         def read_file(filename: str) -> str:
-            if verbose:
-                print(f"Reading file: {filename}")
+            log.debug("Reading file: %s", filename)
             return self.tools.read_file(filename)
         
         @agent.tool_plain
         def write_file(filename: str, content: str, mode: str = 'w') -> str:
-            if verbose:
-                print(f"Writing to file: {filename}")
+            log.debug("Writing to file: %s", filename)
             return self.tools.write_file(filename, content, mode)
         
         @agent.tool_plain
         def delete_file(filename: str) -> str:
-            if verbose:
-                print(f"Deleting file: {filename}")
+            log.debug("Deleting file: %s", filename)
             return self.tools.delete_file(filename)
         
         @agent.tool_plain
         def answer_question_about_files(query: str) -> str:
-            if verbose:
-                print(f"Answering question about files: {query}")
+            log.debug("Answering question about files: %s", query)
             return self.tools.answer_question_about_files(query)
         
 
@@ -103,7 +100,7 @@ class MultiModelFileAgent:
             return result.output
         except Exception as e:
             return RequestClassification(
-                request_type="complex",
+                request_type=RequestType.COMPLEX,
                 confidence=0.0,
                 reasoning=f"Classification failed: {str(e)}, defaulting to complex analysis",
             )
@@ -129,7 +126,7 @@ class MultiModelFileAgent:
         except Exception as e:
             return f"Error handling complex request: {str(e)}"
     
-    async def process(self, user_input: str, verbose: bool = False) -> str:
+    async def process(self, user_input: str) -> str:
         try:
             classification = await self.classify_request(user_input)
             
@@ -137,13 +134,11 @@ class MultiModelFileAgent:
                 response = await self.handle_invalid_request(classification)
                 
             elif classification.request_type == RequestType.SIMPLE:
-                if verbose:
-                    print("Using simple agent...")
+                log.debug("Using simple agent...")
                 response = await self.handle_simple_request(user_input)
                     
             else:
-                if verbose:
-                    print("Using complex agent...")
+                log.debug("Using complex agent...")
                 response = await self.handle_complex_request(user_input)
             
             return response
@@ -193,13 +188,17 @@ def parse_args():
 async def main():
     args = parse_args()
     
+    logging.basicConfig(format="%(message)s")
+    if args.verbose:
+        log.setLevel(logging.DEBUG)
+    
     agent = MultiModelFileAgent(
         base_dir=args.dir if args.dir else os.path.join(os.getcwd(), "file_workspace"),
         light_model=args.light_model,
         powerful_model=args.powerful_model
     )
     
-    response = await agent.process(args.query, verbose=args.verbose)
+    response = await agent.process(args.query)
     print(response)
 
 
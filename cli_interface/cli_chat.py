@@ -5,8 +5,7 @@ import sys
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
-#from agent.agent import MultiModelFileAgent
-from agent.agent_copy import MultiModelFileAgent
+from agent.agent import MultiModelFileAgent
 
 async def main():
     work_dir = os.getenv("WORK_DIR") if os.getenv("WORK_DIR") else os.path.join(os.getcwd(), "file_workspace")
@@ -46,6 +45,8 @@ async def main():
             break
         except Exception as e:
             print(f"\nError: {e}")
+    
+    await agent.aclose()
 
 
 if __name__ == "__main__":
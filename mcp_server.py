@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 import logging
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -30,6 +30,23 @@ def safe_path(filename: str) -> str:
     return os.path.join(WORKSPACE, basename)
 """
 
+# Blocking file I/O helpers, run in worker threads so the event loop keeps
+# serving other tool calls while the disk is busy.
+def _list_entries() -> List[Tuple[str, int]]:
+    with os.scandir(WORKSPACE) as it:
+        return [(e.name, e.stat(follow_symlinks=False).st_size) for e in it if e.is_file(follow_symlinks=False)]
+
+
+def _read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _write_text(path: str, content: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
 @server.list_tools()
 async def handle_list_tools() -> List[Tool]:
     return [
@@ -78,65 +95,72 @@ async def handle_list_tools() -> List[Tool]:
     ]
 
 
+async def _do_list(arguments: Any) -> str:
+    entries = await asyncio.to_thread(_list_entries)
+    if not entries:
+        return "No files in workspace"
+    file_list = [f"- {name} ({size} bytes)" for name, size in entries]
+    return "Files in workspace:\n" + "\n".join(file_list)
+
+
+async def _do_read(arguments: Any) -> str:
+    filename = arguments.get("filename", "")
+    path = os.path.join(WORKSPACE, filename)
+    
+    try:
+        content = await asyncio.to_thread(_read_text, path)
+    except FileNotFoundError:
+        return f"Error: File '{filename}' not found"
+    return f"Content of '{filename}':\n{content}"
+
+
+async def _do_write(arguments: Any) -> str:
+    filename = arguments.get("filename", "")
+    content = arguments.get("content", "")
+    path = os.path.join(WORKSPACE, filename)
+    
+    await asyncio.to_thread(_write_text, path, content)
+    return f"Successfully wrote to '{filename}'"
+
+
+async def _do_delete(arguments: Any) -> str:
+    filename = arguments.get("filename", "")
+    path = os.path.join(WORKSPACE, filename)
+    
+    try:
+        await asyncio.to_thread(os.unlink, path)
+    except FileNotFoundError:
+        return f"Error: File '{filename}' not found"
+    return f"Successfully deleted '{filename}'"
+
+
+_DISPATCH: Dict[str, Callable[[Any], Awaitable[str]]] = {
+    "list_files": _do_list,
+    "read_file": _do_read,
+    "write_file": _do_write,
+    "delete_file": _do_delete,
+}
+
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Any) -> List[TextContent]:
-    logger.info(f"Tool called: {name}")
+    logger.info("Tool called: %s", name)
     
-    try:
-        if name == "list_files":
-            files = os.listdir(WORKSPACE)
-            if not files:
-                text = "No files in workspace"
-            else:
-                file_list = []
-                for f in files:
-                    size = os.path.getsize(os.path.join(WORKSPACE, f))
-                    file_list.append(f"- {f} ({size} bytes)")
-                text = "Files in workspace:\n" + "\n".join(file_list)
-        
-        elif name == "read_file":
-            filename = arguments.get("filename", "")
-            path = os.path.join(WORKSPACE, filename)
-            
-            if not os.path.exists(path):
-                text = f"Error: File '{filename}' not found"
-            else:
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                text = f"Content of '{filename}':\n{content}"
-        
-        elif name == "write_file":
-            filename = arguments.get("filename", "")
-            content = arguments.get("content", "")
-            path = os.path.join(WORKSPACE, filename)
-            
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            text = f"Successfully wrote to '{filename}'"
-        
-        elif name == "delete_file":
-            filename = arguments.get("filename", "")
-            path = os.path.join(WORKSPACE, filename)
-            
-            if os.path.exists(path):
-                os.remove(path)
-                text = f"Successfully deleted '{filename}'"
-            else:
-                text = f"Error: File '{filename}' not found"
-        
-        else:
-            text = f"Error: Unknown tool '{name}'"
-        
-        return [TextContent(type="text", text=text)]
+    handler = _DISPATCH.get(name)
+    if handler is None:
+        return [TextContent(type="text", text=f"Error: Unknown tool '{name}'")]
     
+    try:
+        text = await handler(arguments)
     except Exception as e:
-        logger.error(f"Error in {name}: {e}")
-        return [TextContent(type="text", text=f"Error: {str(e)}")]
+        logger.error("Error in %s: %s", name, e)
+        text = f"Error: {str(e)}"
+    return [TextContent(type="text", text=text)]
 
 
 async def main():
     logger.info("Starting MCP server...")
-    logger.info(f"Workspace: {WORKSPACE}")
+    logger.info("Workspace: %s", WORKSPACE)
     
     async with stdio_server() as (read_stream, write_stream):
         await server.run(
@@ -152,5 +176,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Server stopped")
     except Exception as e:
-        logger.error(f"Server error: {e}")
+        logger.error("Server error: %s", e)
         sys.exit(1)
\ No newline at end of file
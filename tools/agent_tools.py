@@ -1,98 +1,322 @@
+import functools
+import io
 import os
-from typing import List, Dict, Any
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Tuple, NamedTuple, BinaryIO
 from datetime import datetime
-from pydantic import BaseModel, Field
+import numpy as np
 
 
-class FileInfo(BaseModel):
+class FileInfo(NamedTuple):
     name: str
     size: int
-    modified: float
-    created: float
+    # Nanoseconds since the epoch, as reported by os.stat.
+    modified: int
+    created: int
     is_file: bool
 
 
+def _read_text(f: BinaryIO, size: int) -> str:
+    """Reads a whole file into one buffer sized from fstat and decodes it once."""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+    while offset < size:
+        n = f.readinto(view[offset:])
+        if not n:
+            break
+        offset += n
+    view.release()
+    if offset < size:
+        del buf[offset:]
+    text = buf.decode('utf-8')
+    # Match text-mode reads, which translate \r\n and \r to \n.
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _named_os_error(error: OSError, filename: str) -> OSError:
+    """Rebuilds an OSError raised for a bytes path so it names the str filename instead."""
+    return type(error)(error.errno, error.strerror, filename)
+
+
+READ_CACHE_SIZE = 64
+
+
 class FileTools:
     
-    def __init__(self, base_dir: str):
-        self.base_dir = os.path.abspath(base_dir)
-        if not os.path.exists(self.base_dir):
-            os.makedirs(self.base_dir)
+    def __init__(self, base_dir: str, parallel_stat: bool = False, stat_workers: int = 32):
+        self.base_dir = os.path.realpath(base_dir)
+        os.makedirs(self.base_dir, exist_ok=True)
+        # On network or FUSE filesystems each stat is a round trip; fanning them out
+        # over threads overlaps the waits. Not worth the thread overhead on local disks.
+        self.parallel_stat = parallel_stat
+        self.stat_workers = stat_workers
+        # Encoded once so per-call paths are a bytes concatenation instead of
+        # os.path.join plus an implicit fsencode inside every syscall.
+        self._base_prefix = os.fsencode(os.path.join(self.base_dir, ""))
+        # Decoded contents keyed by (filename, mtime_ns, size), in LRU order.
+        self._read_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        # Sync tools run on executor threads, so LRU updates must not interleave.
+        self._read_cache_lock = threading.Lock()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Scans the directory, computing the files and every Q&A aggregate in one pass.
+
+        Snapshots are not kept between calls: in-place edits don't change the
+        directory mtime, so a reused scan could report stale sizes and dates.
+        """
+        with os.scandir(self.base_dir) as it:
+            entries = [entry for entry in it if entry.is_file(follow_symlinks=False)]
+        if self.parallel_stat and len(entries) > 1:
+            with ThreadPoolExecutor(max_workers=self.stat_workers) as pool:
+                stats = list(pool.map(lambda entry: entry.stat(follow_symlinks=False), entries))
+        else:
+            stats = [entry.stat(follow_symlinks=False) for entry in entries]
+        # A tuple, so handlers sharing one snapshot in a batch can't change it for each other.
+        files = tuple(
+            FileInfo(entry.name, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, True)
+            for entry, stat in zip(entries, stats)
+        )
+        
+        # Column arrays let the aggregates run as C loops instead of per-file Python.
+        names = [f.name for f in files]
+        sizes = np.fromiter((f.size for f in files), dtype=np.int64, count=len(files))
+        mtimes = np.fromiter((f.modified for f in files), dtype=np.int64, count=len(files))
+        # The columns are only needed for the aggregates, so the snapshot keeps just the results.
+        snapshot: Dict[str, Any] = {"files": files}
+        if files:
+            largest, smallest = int(sizes.argmax()), int(sizes.argmin())
+            newest, oldest = int(mtimes.argmax()), int(mtimes.argmin())
+            snapshot.update(
+                largest=(names[largest], int(sizes[largest])),
+                smallest=(names[smallest], int(sizes[smallest])),
+                newest=(names[newest], int(mtimes[newest])),
+                oldest=(names[oldest], int(mtimes[oldest])),
+                total=int(sizes.sum()),
+            )
+        else:
+            snapshot.update(largest=None, smallest=None, newest=None, oldest=None, total=0)
+        return snapshot
 
     def list_files(self) -> List[FileInfo]:
-        files = []
-        for item in os.listdir(self.base_dir):
-            path = os.path.join(self.base_dir, item)
-            if os.path.isfile(path):
-                stat = os.stat(path)
-                files.append(FileInfo(
-                    name=item,
-                    size=stat.st_size,
-                    modified=stat.st_mtime,
-                    created=stat.st_ctime,
-                    is_file=True
-                ))
-        return files
+        return list(self._snapshot()["files"])
+    
+    def list_files_raw(self) -> List[Dict[str, Any]]:
+        """Same as list_files, but as plain dicts for tool results, with timestamps in seconds."""
+        return [
+            {**f._asdict(), "modified": f.modified / 1e9, "created": f.created / 1e9}
+            for f in self.list_files()
+        ]
+    
+    def _path(self, filename: str) -> bytes:
+        return self._base_prefix + os.fsencode(filename)
     
     def read_file(self, filename: str) -> str:
-        path = os.path.join(self.base_dir, filename)
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"File '{filename}' not found") 
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+        path = self._path(filename)
+        try:
+            f = open(path, 'rb', buffering=0)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"File '{filename}' not found") from e
+        except OSError as e:
+            raise _named_os_error(e, filename) from e
+        
+        with f:
+            # fstat on the open descriptor describes exactly the file being read.
+            st = os.fstat(f.fileno())
+            key = (filename, st.st_mtime_ns, st.st_size)
+            with self._read_cache_lock:
+                content = self._read_cache.get(key)
+                if content is not None:
+                    self._read_cache.move_to_end(key)
+                    return content
+            content = _read_text(f, st.st_size)
+        
+        with self._read_cache_lock:
+            self._read_cache[key] = content
+            if len(self._read_cache) > READ_CACHE_SIZE:
+                self._read_cache.popitem(last=False)
+        return content
     
     def write_file(self, filename: str, content: str, mode: str = 'w') -> str:
         if mode not in ['w', 'a']:
             raise ValueError("Mode must be 'w' (write) or 'a' (append)")
         
-        path = os.path.join(self.base_dir, filename)
-        with open(path, mode, encoding='utf-8') as f:
-            f.write(content)
+        path = self._path(filename)
+        data = content.encode('utf-8')
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        flags |= os.O_TRUNC if mode == 'w' else os.O_APPEND
+        try:
+            fd = os.open(path, flags, 0o666)
+        except OSError as e:
+            raise _named_os_error(e, filename) from e
+        try:
+            # One write covers typical payloads; loop only if the kernel takes less.
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        # A rewrite within the filesystem's timestamp granularity can keep the
+        # same (mtime, size) key, so don't rely on the key alone after our own writes.
+        with self._read_cache_lock:
+            self._read_cache.clear()
         return f"File '{filename}' {'created' if mode == 'w' else 'appended'} successfully"
     
     def delete_file(self, filename: str) -> str:
-        path = os.path.join(self.base_dir, filename)
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"File '{filename}' not found")
-        
-        os.remove(path)
+        path = self._path(filename)
+        try:
+            os.remove(path)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"File '{filename}' not found") from e
+        except OSError as e:
+            raise _named_os_error(e, filename) from e
+        with self._read_cache_lock:
+            self._read_cache.clear()
         return f"File '{filename}' deleted successfully"
     
     def answer_question_about_files(self, query: str) -> str:
-        query_lower = query.lower()
-        files = self.list_files()
+        return self.answer_questions_about_files([query])[0]
+    
+    def count_files(self) -> int:
+        """Counts files from directory entry types alone, without stat'ing any of them."""
+        with os.scandir(self.base_dir) as it:
+            return sum(1 for entry in it if entry.is_file(follow_symlinks=False))
+    
+    def answer_questions_about_files(self, queries: List[str]) -> List[str]:
+        """Answers several queries against a single scan of the directory."""
+        if not queries:
+            return []
+        intents = [_match_intent(query) for query in queries]
+        if all(intent == "count" for intent in intents):
+            # Counting needs neither per-file stats nor FileInfo objects.
+            count = self.count_files()
+            return [_count_message(count) if count else _NO_FILES for _ in intents]
         
+        # Anything else needs the full scan, which answers the counts as well.
+        snapshot = self._snapshot()
+        return [self._answer_question(intent, snapshot["files"], snapshot) for intent in intents]
+    
+    def _answer_question(self, intent: Optional[str], files: Sequence[FileInfo], summary: Dict[str, Any]) -> str:
         if not files:
-            return "No files found in the directory."
-        
-        # Handle common query patterns
-        if "how many" in query_lower and "file" in query_lower:
-            return f"There are {len(files)} files in the directory."
-        
-        if "largest" in query_lower or "biggest" in query_lower:
-            largest = max(files, key=lambda f: f.size)
-            return f"The largest file is '{largest.name}' with {largest.size} bytes."
-        
-        if "smallest" in query_lower:
-            smallest = min(files, key=lambda f: f.size)
-            return f"The smallest file is '{smallest.name}' with {smallest.size} bytes."
-        
-        if "newest" in query_lower or "most recent" in query_lower or "latest" in query_lower:
-            newest = max(files, key=lambda f: f.modified)
-            mod_time = datetime.fromtimestamp(newest.modified).strftime('%Y-%m-%d %H:%M:%S')
-            return f"The most recently modified file is '{newest.name}' (modified: {mod_time})."
-        
-        if "oldest" in query_lower:
-            oldest = min(files, key=lambda f: f.modified)
-            mod_time = datetime.fromtimestamp(oldest.modified).strftime('%Y-%m-%d %H:%M:%S')
-            return f"The oldest file is '{oldest.name}' (modified: {mod_time})."
-        
-        if "total size" in query_lower:
-            total = sum(f.size for f in files)
-            return f"Total size of all files: {total} bytes ({total / 1024:.2f} KB)."
-        
-        if "list" in query_lower or "show" in query_lower:
-            file_list = "\n".join([f"- {f.name} ({f.size} bytes)" for f in files])
-            return f"Files in directory:\n{file_list}"
-        
-        return "I couldn't understand your question. Try asking about file count, sizes, dates, or content searches."
+            return _NO_FILES
+        if intent is None:
+            return "I couldn't understand your question. Try asking about file count, sizes, dates, or content searches."
+        return _INTENT_HANDLERS[intent](files, summary)
+
+
+# Keyword -> intent table; "count" only applies together with "file", as in
+# "how many files".
+_KEYWORD_INTENTS = {
+    "how many": "count",
+    "file": "file",
+    "largest": "big",
+    "biggest": "big",
+    "smallest": "small",
+    "newest": "new",
+    "most recent": "new",
+    "latest": "new",
+    "oldest": "old",
+    "total size": "total",
+    "list": "list",
+    "show": "list",
+}
+# All keywords compiled into one alternation, so a single pass over the query
+# finds every keyword it contains. The alternation sits in a zero-width lookahead
+# so matches can overlap ("show many files" has both "show" and "how many").
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in sorted(_KEYWORD_INTENTS, key=len, reverse=True)) + "))",
+    re.I,
+)
+# When a query matches several intents, the first one in this order wins.
+_INTENT_PRIORITY = ("count", "big", "small", "new", "old", "total", "list")
+
+
+_NO_FILES = "No files found in the directory."
+
+
+def _match_intent(query: str) -> Optional[str]:
+    intents = {_KEYWORD_INTENTS[m.group(1).lower()] for m in _KEYWORD_RE.finditer(query)}
+    if "file" not in intents:
+        intents.discard("count")
+    for intent in _INTENT_PRIORITY:
+        if intent in intents:
+            return intent
+    return None
+
+
+def _format_time(timestamp_ns: int) -> str:
+    return datetime.fromtimestamp(timestamp_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _count_message(count: int) -> str:
+    return f"There are {count} files in the directory."
+
+
+def _answer_count(files, summary) -> str:
+    return _count_message(len(files))
+
+
+def _answer_largest(files, summary) -> str:
+    name, size = summary["largest"]
+    return f"The largest file is '{name}' with {size} bytes."
+
+
+def _answer_smallest(files, summary) -> str:
+    name, size = summary["smallest"]
+    return f"The smallest file is '{name}' with {size} bytes."
+
+
+def _answer_newest(files, summary) -> str:
+    name, modified = summary["newest"]
+    return f"The most recently modified file is '{name}' (modified: {_format_time(modified)})."
+
+
+def _answer_oldest(files, summary) -> str:
+    name, modified = summary["oldest"]
+    return f"The oldest file is '{name}' (modified: {_format_time(modified)})."
+
+
+def _answer_total(files, summary) -> str:
+    total = summary["total"]
+    return f"Total size of all files: {total} bytes ({total / 1024:.2f} KB)."
+
+
+def _answer_list(files, summary) -> str:
+    buf = io.StringIO()
+    w = buf.write
+    w("Files in directory:")
+    for name, size, _, _, _ in files:
+        w("\n- ")
+        w(name)
+        w(" (")
+        w(str(size))
+        w(" bytes)")
+    return buf.getvalue()
+
+
+_INTENT_HANDLERS = {
+    "count": _answer_count,
+    "big": _answer_largest,
+    "small": _answer_smallest,
+    "new": _answer_newest,
+    "old": _answer_oldest,
+    "total": _answer_total,
+    "list": _answer_list,
+}
+
+
+def get_file_tools(base_dir: str) -> FileTools:
+    """Returns a shared FileTools instance for the given directory."""
+    # Keyed on the resolved path, so "." and its absolute spelling share one instance
+    # and its cache invalidation.
+    return _file_tools_for(os.path.realpath(base_dir))
+
+
+@functools.lru_cache(maxsize=None)
+def _file_tools_for(real_dir: str) -> FileTools:
+    return FileTools(real_dir)